@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (
     QPushButton, QGraphicsView, QGraphicsScene, QGraphicsRectItem,
     QGraphicsTextItem, QDialog, QFormLayout, QLineEdit, 
     QMessageBox, QDateEdit, QInputDialog, QGraphicsLineItem,
-    QLabel, QSpinBox, QFrame
+    QLabel, QSpinBox, QFrame, QComboBox
 )
 from PyQt5.QtGui import QColor, QBrush, QPen, QFont, QPainter, QTextOption
 from PyQt5.QtCore import Qt, QDate, pyqtSignal, QTimer
@@ -59,6 +59,19 @@ class DatabaseManager:
                 start_time_iso TEXT NOT NULL
             )
         """)
+        # Tabella per la lista d'attesa, indicizzata per data e fascia
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS waitlist (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_date TEXT NOT NULL,
+                slot TEXT NOT NULL,
+                client_name TEXT NOT NULL,
+                phone_number TEXT,
+                row_pref INTEGER,
+                wing_pref TEXT
+            )
+        """)
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_waitlist_date_slot ON waitlist (request_date, slot)")
         self.conn.commit()
 
     def get_bookings_for_date(self, date_str):
@@ -141,6 +154,61 @@ class DatabaseManager:
         except sqlite3.Error as e:
             print(f"Error ending rental: {e}")
 
+    # --- FUNZIONI PER LA LISTA D'ATTESA ---
+    def get_waitlist_for_date(self, date_str):
+        if not self.conn: return []
+        try:
+            self.cursor.execute("""
+                SELECT id, slot, client_name, phone_number, row_pref, wing_pref
+                FROM waitlist WHERE request_date = ? ORDER BY id
+            """, (date_str,))
+            return self.cursor.fetchall()
+        except sqlite3.Error as e:
+            print(f"Error fetching waitlist: {e}")
+            return []
+
+    def add_waitlist_entry(self, date_str, slot, name, phone, row_pref=None, wing_pref=None):
+        if not self.conn: return
+        try:
+            self.cursor.execute("""
+                INSERT INTO waitlist (request_date, slot, client_name, phone_number, row_pref, wing_pref)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (date_str, slot, name, phone, row_pref, wing_pref))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error adding waitlist entry: {e}")
+
+    def remove_waitlist_entry(self, entry_id):
+        if not self.conn: return
+        try:
+            self.cursor.execute("DELETE FROM waitlist WHERE id = ?", (entry_id,))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"Error removing waitlist entry: {e}")
+
+    def find_waitlist_match(self, date_str, slots, row, wing):
+        # Usa l'indice (request_date, slot): nessuna scansione completa della lista.
+        # Le preferenze non compatibili escludono la richiesta; a parità di fascia
+        # vince chi ha più preferenze soddisfatte, poi chi si è iscritto prima.
+        if not self.conn or not slots: return None
+        try:
+            placeholders = ", ".join("?" for _ in slots)
+            self.cursor.execute(f"""
+                SELECT id, slot, client_name, phone_number, row_pref, wing_pref
+                FROM waitlist
+                WHERE request_date = ? AND slot IN ({placeholders})
+                  AND (row_pref IS NULL OR row_pref = ?)
+                  AND (wing_pref IS NULL OR wing_pref = ?)
+                ORDER BY CASE slot WHEN 'full_day' THEN 0 ELSE 1 END,
+                         (row_pref IS NOT NULL) + (wing_pref IS NOT NULL) DESC,
+                         id
+                LIMIT 1
+            """, (date_str, *slots, row, wing))
+            return self.cursor.fetchone()
+        except sqlite3.Error as e:
+            print(f"Error matching waitlist: {e}")
+            return None
+
     def close(self):
         if self.conn:
             self.conn.close()
@@ -322,6 +390,112 @@ class SupRentalDialog(QDialog):
         card.setParent(None)
         card.deleteLater()
 
+# --- LISTA D'ATTESA ---
+SLOT_LABELS = {'full_day': "Giornata Intera", 'morning': "Mattina", 'afternoon': "Pomeriggio"}
+WING_LABELS = {'left': "Sinistra", 'right': "Destra"}
+
+class WaitlistDialog(QDialog):
+    def __init__(self, db_manager, date_str, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.date_str = date_str
+        self.setWindowTitle(f"Lista d'Attesa - {date_str}")
+        self.setMinimumSize(700, 400)
+
+        main_layout = QVBoxLayout(self)
+
+        new_entry_frame = QFrame()
+        new_entry_frame.setFrameShape(QFrame.StyledPanel)
+        new_entry_layout = QHBoxLayout(new_entry_frame)
+
+        self.name_input = QLineEdit()
+        self.name_input.setPlaceholderText("Nome Cliente")
+        new_entry_layout.addWidget(self.name_input)
+
+        self.phone_input = QLineEdit()
+        self.phone_input.setPlaceholderText("Telefono")
+        new_entry_layout.addWidget(self.phone_input)
+
+        self.slot_input = QComboBox()
+        for slot, label in SLOT_LABELS.items():
+            self.slot_input.addItem(label, slot)
+        new_entry_layout.addWidget(self.slot_input)
+
+        self.wing_input = QComboBox()
+        self.wing_input.addItem("Settore: Qualsiasi", None)
+        for wing, label in WING_LABELS.items():
+            self.wing_input.addItem(f"Settore: {label}", wing)
+        new_entry_layout.addWidget(self.wing_input)
+
+        self.row_input = QSpinBox()
+        self.row_input.setRange(0, 4)
+        self.row_input.setPrefix("Fila: ")
+        self.row_input.setSpecialValueText("Fila: Qualsiasi")
+        new_entry_layout.addWidget(self.row_input)
+
+        add_button = QPushButton("Aggiungi")
+        add_button.setStyleSheet("background-color: #66bb6a; color: white;")
+        add_button.clicked.connect(self.add_entry)
+        new_entry_layout.addWidget(add_button)
+
+        main_layout.addWidget(new_entry_frame)
+
+        main_layout.addWidget(QLabel("<b>In Attesa:</b>"))
+        self.entries_layout = QVBoxLayout()
+        main_layout.addLayout(self.entries_layout)
+        main_layout.addStretch()
+
+        self.load_entries()
+
+    def load_entries(self):
+        for i in reversed(range(self.entries_layout.count())):
+            self.entries_layout.itemAt(i).widget().setParent(None)
+
+        for entry_id, slot, name, phone, row_pref, wing_pref in self.db_manager.get_waitlist_for_date(self.date_str):
+            card = QFrame()
+            card.setFrameShape(QFrame.StyledPanel)
+            card.setStyleSheet("background-color: #fff3e0; border-radius: 5px;")
+            card_layout = QHBoxLayout(card)
+
+            prefs = []
+            if wing_pref: prefs.append(f"settore {WING_LABELS.get(wing_pref, wing_pref)}")
+            if row_pref: prefs.append(f"fila {row_pref}")
+            info_text = f"<b>{name}</b> - {SLOT_LABELS.get(slot, slot)}"
+            if phone: info_text += f" - tel: {phone}"
+            if prefs: info_text += f" ({', '.join(prefs)})"
+            card_layout.addWidget(QLabel(info_text))
+            card_layout.addStretch()
+
+            remove_button = QPushButton("Rimuovi")
+            remove_button.setStyleSheet("background-color: #ef5350; color: white;")
+            remove_button.clicked.connect(lambda _, eid=entry_id: self.remove_entry(eid))
+            card_layout.addWidget(remove_button)
+
+            self.entries_layout.addWidget(card)
+
+    def add_entry(self):
+        name = self.name_input.text().strip()
+        if not name:
+            QMessageBox.warning(self, "Dati Mancanti", "Inserire il nome del cliente.")
+            return
+
+        self.db_manager.add_waitlist_entry(
+            self.date_str,
+            self.slot_input.currentData(),
+            name,
+            self.phone_input.text().strip(),
+            self.row_input.value() or None,
+            self.wing_input.currentData()
+        )
+
+        self.name_input.clear()
+        self.phone_input.clear()
+        self.load_entries()
+
+    def remove_entry(self, entry_id):
+        self.db_manager.remove_waitlist_entry(entry_id)
+        self.load_entries()
+
 # --- VISTA: La casella grafica (NON MODIFICATA) ---
 class BookingCellItem(QGraphicsRectItem):
     def __init__(self, r, c, wing, cell_number, parent=None):
@@ -532,6 +706,10 @@ class MainWindow(QMainWindow):
         sup_button.setStyleSheet("background-color: #29b6f6; color: white; font-weight: bold; padding: 5px;")
         sup_button.clicked.connect(self.open_sup_rental)
         
+        waitlist_button = QPushButton("Lista d'Attesa")
+        waitlist_button.setStyleSheet("background-color: #ffa726; color: white; font-weight: bold; padding: 5px;")
+        waitlist_button.clicked.connect(self.open_waitlist)
+
         reset_button = QPushButton("Reset Database")
         reset_button.setStyleSheet("background-color: #d32f2f; color: white; font-weight: bold; padding: 5px;")
         reset_button.clicked.connect(self.reset_database)
@@ -541,6 +719,7 @@ class MainWindow(QMainWindow):
         nav_layout.addWidget(next_button)
         nav_layout.addSpacing(50)
         nav_layout.addWidget(sup_button)
+        nav_layout.addWidget(waitlist_button)
         nav_layout.addWidget(reset_button)
         self.main_layout.addLayout(nav_layout)
 
@@ -559,6 +738,10 @@ class MainWindow(QMainWindow):
     def on_sup_dialog_closed(self):
         self.sup_rental_dialog = None
 
+    def open_waitlist(self):
+        date_str = self.current_date.toString(Qt.ISODate)
+        WaitlistDialog(self.db_manager, date_str, self).exec_()
+
     def load_current_date_bookings(self):
         self.current_date = self.date_edit.date()
         date_str = self.current_date.toString(Qt.ISODate)
@@ -615,6 +798,8 @@ class MainWindow(QMainWindow):
         action, ok = QInputDialog.getItem(self, "Gestione Prenotazione", f"Postazione {cell_number}:", actions, 0, False)
         if not ok or not action: return
 
+        free_before = self._get_free_slots(cell_key)
+
         if "Giornata Intera" in action:
             new_details = self._get_booking_details(cell_number, data['full_day'])
             self.grid_view.cells_data[cell_key]['full_day'] = new_details or self.grid_view.get_empty_booking_data()['full_day']
@@ -627,6 +812,43 @@ class MainWindow(QMainWindow):
         
         self._save_and_update(cell_key)
 
+        if set(self._get_free_slots(cell_key)) - set(free_before):
+            self._propose_waitlist_match(cell_key)
+
+    def _get_free_slots(self, cell_key):
+        data = self.grid_view.cells_data[cell_key]
+        if any(v for k, v in data['full_day'].items() if k != 'staff'):
+            return []
+        free = [slot for slot in ('morning', 'afternoon')
+                if not any(v for k, v in data[slot].items() if k != 'staff')]
+        if len(free) == 2:
+            free.insert(0, 'full_day')
+        return free
+
+    def _propose_waitlist_match(self, cell_key):
+        item = self.grid_view.cells_items[cell_key]
+        date_str = self.current_date.toString(Qt.ISODate)
+
+        while True:
+            free_slots = self._get_free_slots(cell_key)
+            match = self.db_manager.find_waitlist_match(date_str, free_slots, item.r + 1, item.wing)
+            if not match: return
+
+            entry_id, slot, name, phone, _, _ = match
+            item.setBrush(QColor("#ffcc80"))
+            text = f"Postazione {item.cell_number} libera ({SLOT_LABELS[slot]}).\n\n" \
+                   f"In lista d'attesa: {name}"
+            if phone: text += f" - tel: {phone}"
+            text += "\n\nAssegnare la postazione?"
+            reply = QMessageBox.question(self, "Lista d'Attesa", text, QMessageBox.Yes | QMessageBox.No)
+            if reply != QMessageBox.Yes:
+                self.grid_view.update_cell_display(cell_key)
+                return
+
+            self.grid_view.cells_data[cell_key][slot] = {'name': name, 'time': '', 'phone': phone or '', 'staff': ''}
+            self.db_manager.remove_waitlist_entry(entry_id)
+            self._save_and_update(cell_key)
+
     def _get_booking_details(self, cell_number, initial_data=None):
         dialog = BookingDetailsDialog(self, str(cell_number), initial_data)
         if dialog.exec_() == QDialog.Accepted: